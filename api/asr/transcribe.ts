@@ -21,7 +21,8 @@ export default withObservability(async function handler(req: VercelRequest, res:
 
   const audioUrl = String(body.audioUrl || '')
   const language = body.language ? String(body.language) : 'pt'
-  const model = body.model ? String(body.model) : 'small'
+  // Omitted model lets the worker pick (short clips go to its faster short-clip model)
+  const model = body.model ? String(body.model) : undefined
 
   if (!audioUrl) {
     return res.status(400).json({ error: 'audioUrl required', requestId: ctx.requestId })
@@ -215,7 +215,8 @@ export default withObservability(async function handler(req: VercelRequest, res:
             'Content-Type': 'application/json',
             ...(process.env.ASR_TOKEN ? { Authorization: `Bearer ${process.env.ASR_TOKEN}` } : {}),
           },
-          body: JSON.stringify({ audioUrl, language: 'pt', model: 'small' }),
+          // No model: the worker uses WHISPER_MODEL (or its short-clip model)
+          body: JSON.stringify({ audioUrl, language: 'pt' }),
         })
 
         clearTimeout(timeout)
@@ -6,6 +6,7 @@ AUDIO_PATH = r"D:\tm-ia\test.mp3"
 MODEL_SIZE = "tiny" # Use tiny for fast local test
 DEVICE = "cpu"
 COMPUTE_TYPE = "int8"
+LANGUAGE = os.getenv("WHISPER_LANGUAGE", "pt") or None # empty = auto-detect
 
 def main():
     if not os.path.exists(AUDIO_PATH):
@@ -19,7 +20,12 @@ def main():
 
     print(f"Transcribing {AUDIO_PATH}...")
     start_transcribe = time.time()
-    segments, info = model.transcribe(AUDIO_PATH, language="pt")
+    segments, info = model.transcribe(
+        AUDIO_PATH,
+        language=LANGUAGE,
+        vad_filter=True,
+        vad_parameters=dict(min_silence_duration_ms=500),
+    )
 
     print(f"Detected language: {info.language} with probability {info.language_probability:.2f}")
     
@@ -21,15 +21,18 @@ NOTE: This script avoids web scraping; it uses official google-cloud-* clients o
 from __future__ import annotations
 
 import argparse
+import asyncio
 import dataclasses
 import datetime as dt
-import json
 import logging
 import os
 import re
+import time
 from decimal import Decimal
 from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
+import orjson
+from google.api_core import exceptions as gexc
 from google.cloud import billing_v1
 from google.cloud import aiplatform_v1
 
@@ -38,27 +41,88 @@ from google.cloud import aiplatform_v1
 # Pricing (Cloud Billing Catalog)
 # -----------------------------
 
-@dataclasses.dataclass(frozen=True)
-class SkuPrice:
-    service_display_name: str
-    service_name: str
-    sku_id: str
-    sku_description: str
-    region: Optional[str]
-    usage_unit: str
-    currency: str
-    unit_price: Decimal  # price per usage_unit
+DEFAULT_FAMILY_REGEX = r"\bE2\b|\bN1\b"
+_DEFAULT_FAMILY_RX = re.compile(DEFAULT_FAMILY_REGEX, re.IGNORECASE | re.ASCII)
 
+_NANOS_PER_UNIT = 1_000_000_000
+_DECIMAL_NANOS_PER_UNIT = Decimal(_NANOS_PER_UNIT)
 
-def _money_to_decimal(money: billing_v1.types.Money) -> Decimal:
-    """Convert Money {units, nanos} to Decimal."""
-    units = Decimal(money.units or 0)
-    nanos = Decimal(money.nanos or 0) / Decimal(1_000_000_000)
-    return units + nanos
 
+def _money_to_nanos(money: billing_v1.types.Money) -> int:
+    """Convert Money {units, nanos} to an integer amount of nanos."""
+    return (money.units or 0) * _NANOS_PER_UNIT + (money.nanos or 0)
 
-def list_services(client: billing_v1.CloudCatalogClient) -> List[billing_v1.types.Service]:
-    return list(client.list_services())
+
+def _nanos_to_decimal(nanos: int) -> Decimal:
+    return Decimal(nanos) / _DECIMAL_NANOS_PER_UNIT
+
+
+@dataclasses.dataclass
+class SkuPriceTable:
+    """Filtered SKU prices stored column-wise (one list per field, same index per SKU).
+
+    Avoids one object per SKU and serializes straight to a dict of lists.
+    """
+
+    service_display_names: List[str] = dataclasses.field(default_factory=list)
+    service_names: List[str] = dataclasses.field(default_factory=list)
+    sku_ids: List[str] = dataclasses.field(default_factory=list)
+    sku_descriptions: List[str] = dataclasses.field(default_factory=list)
+    regions: List[Optional[str]] = dataclasses.field(default_factory=list)
+    usage_units: List[str] = dataclasses.field(default_factory=list)
+    currencies: List[str] = dataclasses.field(default_factory=list)
+    unit_price_nanos: List[int] = dataclasses.field(default_factory=list)  # price per usage_unit, in nanos
+
+    def __len__(self) -> int:
+        return len(self.sku_ids)
+
+    def append(
+        self,
+        *,
+        service_display_name: str,
+        service_name: str,
+        sku_id: str,
+        sku_description: str,
+        region: Optional[str],
+        usage_unit: str,
+        currency: str,
+        unit_price_nanos: int,
+    ) -> None:
+        self.service_display_names.append(service_display_name)
+        self.service_names.append(service_name)
+        self.sku_ids.append(sku_id)
+        self.sku_descriptions.append(sku_description)
+        self.regions.append(region)
+        self.usage_units.append(usage_unit)
+        self.currencies.append(currency)
+        self.unit_price_nanos.append(unit_price_nanos)
+
+    def sorted(self) -> "SkuPriceTable":
+        """Return a copy in stable order (description, unit, price) for diffs."""
+        order = sorted(
+            range(len(self)),
+            key=lambda i: (self.sku_descriptions[i], self.usage_units[i], self.unit_price_nanos[i]),
+        )
+        return SkuPriceTable(**{
+            f.name: [getattr(self, f.name)[i] for i in order]
+            for f in dataclasses.fields(self)
+        })
+
+    def unit_prices(self) -> List[Decimal]:
+        """Unit prices as Decimal, converted once at write time."""
+        return [_nanos_to_decimal(n) for n in self.unit_price_nanos]
+
+    def to_columns(self) -> Dict[str, List[Any]]:
+        return {
+            "service_display_name": self.service_display_names,
+            "service_name": self.service_names,
+            "sku_id": self.sku_ids,
+            "sku_description": self.sku_descriptions,
+            "region": self.regions,
+            "usage_unit": self.usage_units,
+            "currency": self.currencies,
+            "unit_price": self.unit_prices(),
+        }
 
 
 def find_service_by_display_name(
@@ -66,11 +130,17 @@ def find_service_by_display_name(
     display_name_regex: str,
 ) -> billing_v1.types.Service:
     rx = re.compile(display_name_regex, re.IGNORECASE)
-    matches = [s for s in services if rx.search(s.display_name or "")]
+    matches = []
+    for s in services:
+        if not rx.search(s.display_name or ""):
+            continue
+        # An exact "Compute Engine" match wins outright; stop paging services.
+        if (s.display_name or "").lower() == "compute engine":
+            return s
+        matches.append(s)
     if not matches:
         raise RuntimeError(f"No billing service matched regex: {display_name_regex}")
-    # Prefer exact "Compute Engine" if present.
-    matches.sort(key=lambda s: (0 if (s.display_name or "").lower() == "compute engine" else 1, s.display_name or ""))
+    matches.sort(key=lambda s: s.display_name or "")
     return matches[0]
 
 
@@ -78,17 +148,50 @@ def iter_skus(
     client: billing_v1.CloudCatalogClient,
     service_name: str,
 ) -> Iterator[billing_v1.types.Sku]:
-    req = billing_v1.ListSkusRequest(parent=service_name)
+    # 5000 is the API maximum; fewer pages means fewer round-trips over ~10k SKUs.
+    req = billing_v1.ListSkusRequest(parent=service_name, page_size=5000)
     yield from client.list_skus(request=req)
 
 
-def sku_has_region(sku: billing_v1.types.Sku, region: str) -> bool:
+SKU_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "tm-ia", "billing-catalog")
+
+
+def load_skus(
+    client: billing_v1.CloudCatalogClient,
+    service_name: str,
+    *,
+    cache_ttl_hours: float = 24.0,
+) -> List[billing_v1.types.Sku]:
+    """List SKUs for a service, reusing an on-disk copy younger than cache_ttl_hours.
+
+    The cache is one serialized ListSkusResponse (protobuf wire format) per service.
+    cache_ttl_hours <= 0 disables it.
+    """
+    path = os.path.join(SKU_CACHE_DIR, service_name.replace("/", "_") + ".pb")
+    if cache_ttl_hours > 0 and os.path.exists(path):
+        age_hours = (time.time() - os.path.getmtime(path)) / 3600
+        if age_hours < cache_ttl_hours:
+            logging.info("Using cached SKUs from %s (%.1fh old)", path, age_hours)
+            with open(path, "rb") as f:
+                return list(billing_v1.ListSkusResponse.deserialize(f.read()).skus)
+
+    skus = list(iter_skus(client, service_name))
+    if cache_ttl_hours > 0:
+        os.makedirs(SKU_CACHE_DIR, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(billing_v1.ListSkusResponse.serialize(billing_v1.ListSkusResponse(skus=skus)))
+        os.replace(tmp_path, path)
+    return skus
+
+
+def sku_has_region(sku: billing_v1.types.Sku, region: str, region_lower: Optional[str] = None) -> bool:
     # Most SKU region signals show up in service_regions.
     if sku.service_regions:
         return region in sku.service_regions
     # Fallback: try to infer from description.
     desc = (sku.description or "").lower()
-    return region.lower() in desc
+    return (region_lower or region.lower()) in desc
 
 
 def _extract_first_pricing_info(sku: billing_v1.types.Sku) -> Optional[billing_v1.types.PricingInfo]:
@@ -120,8 +223,9 @@ def _pick_rate(
 def list_compute_skus_pricing(
     *,
     region: str = "us-central1",
-    family_regex: str = r"\bE2\b|\bN1\b",
-) -> List[SkuPrice]:
+    family_regex: str = DEFAULT_FAMILY_REGEX,
+    cache_ttl_hours: float = 24.0,
+) -> SkuPriceTable:
     """List Compute Engine SKUs and normalize their unit prices.
 
     Notes:
@@ -129,22 +233,27 @@ def list_compute_skus_pricing(
       - region
       - a family regex (E2/N1 by default)
     - The unit is whatever Google reports (often "gibibyte hour", "hour", "core hour", etc.).
+    - The SKU list is cached on disk for cache_ttl_hours (see load_skus).
 
     Returns prices in USD per usage_unit.
     """
 
     client = billing_v1.CloudCatalogClient()
-    services = list_services(client)
-    compute = find_service_by_display_name(services, r"Compute Engine")
+    compute = find_service_by_display_name(client.list_services(), r"Compute Engine")
 
-    family_rx = re.compile(family_regex, re.IGNORECASE)
+    if family_regex == DEFAULT_FAMILY_REGEX:
+        family_rx = _DEFAULT_FAMILY_RX
+    else:
+        family_rx = re.compile(family_regex, re.IGNORECASE | re.ASCII)
+    region_lower = region.lower()
 
-    out: List[SkuPrice] = []
-    for sku in iter_skus(client, compute.name):
+    out = SkuPriceTable()
+    for sku in load_skus(client, compute.name, cache_ttl_hours=cache_ttl_hours):
         desc = sku.description or ""
+        # Family regex first: it rejects most SKUs and is cheaper than the region check.
         if not family_rx.search(desc):
             continue
-        if not sku_has_region(sku, region):
+        if not sku_has_region(sku, region, region_lower):
             continue
 
         pi = _extract_first_pricing_info(sku)
@@ -157,31 +266,27 @@ def list_compute_skus_pricing(
             continue
 
         usage_unit, money, currency = picked
-        unit_price = _money_to_decimal(money)
 
         out.append(
-            SkuPrice(
-                service_display_name=compute.display_name or "Compute Engine",
-                service_name=compute.name,
-                sku_id=sku.sku_id or sku.name.split("/")[-1],
-                sku_description=desc,
-                region=region,
-                usage_unit=usage_unit,
-                currency=currency,
-                unit_price=unit_price,
-            )
+            service_display_name=compute.display_name or "Compute Engine",
+            service_name=compute.name,
+            sku_id=sku.sku_id or sku.name.split("/")[-1],
+            sku_description=desc,
+            region=region,
+            usage_unit=usage_unit,
+            currency=currency,
+            unit_price_nanos=_money_to_nanos(money),
         )
 
     # Stable order for diffs
-    out.sort(key=lambda p: (p.sku_description, p.usage_unit, str(p.unit_price)))
-    return out
+    return out.sorted()
 
 
 # -----------------------------
 # Vertex AI availability (Model Garden)
 # -----------------------------
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, slots=True)
 class VertexModelInfo:
     name: str
     display_name: str
@@ -189,6 +294,60 @@ class VertexModelInfo:
     is_video_related: bool
 
 
+def _model_info_to_dict(m: VertexModelInfo) -> Dict[str, Any]:
+    return {
+        "name": m.name,
+        "display_name": m.display_name,
+        "publisher": m.publisher,
+        "is_video_related": m.is_video_related,
+    }
+
+
+def _classify_publisher_model(
+    name: str,
+    result: Any,
+    include_failures: bool,
+) -> Optional[VertexModelInfo]:
+    """Turn a get_publisher_model() result (model or exception) into a VertexModelInfo."""
+    if not isinstance(result, BaseException):
+        dn = getattr(result, "display_name", "") or ""
+        nm = getattr(result, "name", "") or name
+        pub = getattr(result, "publisher", "") or ""
+        hay = (dn + " " + nm).lower()
+        is_video = ("veo" in hay) or ("video" in hay) or ("image-to-video" in hay)
+        return VertexModelInfo(name=nm, display_name=dn or nm, publisher=pub or 'google', is_video_related=is_video)
+
+    if not include_failures:
+        return None
+    if isinstance(result, gexc.NotFound):
+        code = 'NOT_FOUND'
+    elif isinstance(result, gexc.PermissionDenied):
+        code = 'PERMISSION_DENIED'
+    elif isinstance(result, gexc.ServiceUnavailable):
+        code = 'UNAVAILABLE'
+    else:
+        code = 'UNKNOWN'
+        logging.warning("get_publisher_model(%s) failed: %s", name, result)
+
+    return VertexModelInfo(
+        name=name,
+        display_name=f"{name} [{code}]",
+        publisher='google',
+        is_video_related=True,
+    )
+
+
+async def _get_publisher_models(region: str, candidates: List[str]) -> List[Any]:
+    # async with closes the grpc.aio channel before asyncio.run() tears down the loop
+    async with aiplatform_v1.ModelGardenServiceAsyncClient(
+        client_options={"api_endpoint": f"{region}-aiplatform.googleapis.com"}
+    ) as client:
+        return await asyncio.gather(
+            *[client.get_publisher_model(name=name) for name in candidates],
+            return_exceptions=True,
+        )
+
+
 def check_model_garden_candidates(
     *,
     project: str,
@@ -203,7 +362,7 @@ def check_model_garden_candidates(
 
     So we do the robust thing for production automation:
     - maintain a small candidate list of known model ids
-    - call get_publisher_model for each
+    - call get_publisher_model for all of them concurrently (async client)
     - treat NOT_FOUND/PERMISSION_DENIED as "not available" for this project/region
 
     candidates should be full resource names like:
@@ -211,41 +370,13 @@ def check_model_garden_candidates(
       publishers/google/models/veo-3
     """
 
-    client = aiplatform_v1.ModelGardenServiceClient(
-        client_options={"api_endpoint": f"{region}-aiplatform.googleapis.com"}
-    )
+    results = asyncio.run(_get_publisher_models(region, candidates))
 
     out: List[VertexModelInfo] = []
-    for name in candidates:
-        try:
-            m = client.get_publisher_model(name=name)
-            dn = getattr(m, "display_name", "") or ""
-            nm = getattr(m, "name", "") or name
-            pub = getattr(m, "publisher", "") or ""
-            hay = (dn + " " + nm).lower()
-            is_video = ("veo" in hay) or ("video" in hay) or ("image-to-video" in hay)
-            out.append(VertexModelInfo(name=nm, display_name=dn or nm, publisher=pub or 'google', is_video_related=is_video))
-        except Exception as e:
-            if not include_failures:
-                continue
-            msg = str(e)
-            # Best-effort classify without depending on grpc types
-            code = 'UNKNOWN'
-            if 'PERMISSION_DENIED' in msg or '403' in msg:
-                code = 'PERMISSION_DENIED'
-            elif 'NOT_FOUND' in msg or '404' in msg:
-                code = 'NOT_FOUND'
-            elif 'UNAVAILABLE' in msg:
-                code = 'UNAVAILABLE'
-
-            out.append(
-                VertexModelInfo(
-                    name=name,
-                    display_name=f"{name} [{code}]",
-                    publisher='google',
-                    is_video_related=True,
-                )
-            )
+    for name, result in zip(candidates, results):
+        info = _classify_publisher_model(name, result, include_failures)
+        if info is not None:
+            out.append(info)
 
     out.sort(key=lambda x: (0 if x.is_video_related else 1, x.display_name.lower(), x.name))
     return out
@@ -255,10 +386,51 @@ def check_model_garden_candidates(
 # DB Upsert (optional)
 # -----------------------------
 
-def upsert_into_db(db_url: str, prices: List[SkuPrice], models: List[VertexModelInfo]) -> None:
+UPSERT_CHUNK_SIZE = 1000
+
+
+def _bulk_upsert(session: Any, model: Any, rows: List[Dict[str, Any]], keys: List[str]) -> None:
+    """Upsert rows in chunks with one INSERT .. ON CONFLICT statement per chunk.
+
+    Falls back to Session.merge (SELECT + INSERT/UPDATE per row) on dialects
+    without a native upsert.
+    """
+    if not rows:
+        return
+    # One statement may not touch the same key twice (Postgres: "cannot affect row a second
+    # time"); keep the last row per key, as merging row by row would.
+    rows = list({tuple(row[k] for k in keys): row for row in rows}.values())
+
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert
+    else:
+        for row in rows:
+            session.merge(model(**row))
+        return
+
+    update_cols = [c for c in rows[0] if c not in keys]
+    for i in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        stmt = insert(model).values(rows[i:i + UPSERT_CHUNK_SIZE])
+        if dialect in ("mysql", "mariadb"):
+            stmt = stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in update_cols})
+        else:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=keys,
+                set_={c: stmt.excluded[c] for c in update_cols},
+            )
+        session.execute(stmt)
+
+
+def upsert_into_db(db_url: str, prices: SkuPriceTable, models: List[VertexModelInfo]) -> None:
     """Example upsert using SQLAlchemy.
 
     This is intentionally minimal (portable). You can point db_url to Postgres/MySQL/etc.
+    Postgres, SQLite and MySQL use batched native upserts; other dialects merge row by row.
 
     Required dependency: sqlalchemy (+ driver, e.g. psycopg).
     """
@@ -290,29 +462,39 @@ def upsert_into_db(db_url: str, prices: List[SkuPrice], models: List[VertexModel
     Base.metadata.create_all(engine)
 
     now = dt.datetime.utcnow()
-    with Session(engine) as s:
-        for p in prices:
-            row = GcpSkuPrice(
-                sku_id=p.sku_id,
-                region=p.region or "",
-                usage_unit=p.usage_unit,
-                description=p.sku_description,
-                currency=p.currency,
-                unit_price=p.unit_price,
-                updated_at=now,
-            )
-            s.merge(row)
-
-        for m in models:
-            row = VertexPublisherModel(
-                name=m.name,
-                display_name=m.display_name,
-                publisher=m.publisher,
-                is_video_related=m.is_video_related,
-                updated_at=now,
-            )
-            s.merge(row)
+    price_rows = [
+        {
+            "sku_id": sku_id,
+            "region": region or "",
+            "usage_unit": usage_unit,
+            "description": description,
+            "currency": currency,
+            "unit_price": unit_price,
+            "updated_at": now,
+        }
+        for sku_id, region, usage_unit, description, currency, unit_price in zip(
+            prices.sku_ids,
+            prices.regions,
+            prices.usage_units,
+            prices.sku_descriptions,
+            prices.currencies,
+            prices.unit_prices(),
+        )
+    ]
+    model_rows = [
+        {
+            "name": m.name,
+            "display_name": m.display_name,
+            "publisher": m.publisher,
+            "is_video_related": m.is_video_related,
+            "updated_at": now,
+        }
+        for m in models
+    ]
 
+    with Session(engine) as s:
+        _bulk_upsert(s, GcpSkuPrice, price_rows, ["sku_id", "region", "usage_unit"])
+        _bulk_upsert(s, VertexPublisherModel, model_rows, ["name"])
         s.commit()
 
 
@@ -326,7 +508,8 @@ def main() -> None:
     ap = argparse.ArgumentParser(description="Daily Sync (Billing + Vertex AI)")
     ap.add_argument("--project", required=True, help="GCP project id")
     ap.add_argument("--region", default="us-central1", help="Vertex region + SKU region filter")
-    ap.add_argument("--family", default=r"\bE2\b|\bN1\b", help="Regex to filter Compute SKUs by family")
+    ap.add_argument("--family", default=DEFAULT_FAMILY_REGEX, help="Regex to filter Compute SKUs by family")
+    ap.add_argument("--cache-ttl-hours", type=float, default=24.0, help="Reuse the on-disk SKU catalog if younger than this (0 disables)")
     ap.add_argument("--out-json", default=None, help="Write collected data to a JSON file")
     ap.add_argument("--db-url", default=None, help="Optional SQLAlchemy DB URL for upsert")
     ap.add_argument("--model-filter", default=None, help="(unused) reserved for future listing support")
@@ -334,7 +517,11 @@ def main() -> None:
     args = ap.parse_args()
 
     logging.info("Fetching Compute Engine SKUs pricing (region=%s, family=%s)", args.region, args.family)
-    prices = list_compute_skus_pricing(region=args.region, family_regex=args.family)
+    prices = list_compute_skus_pricing(
+        region=args.region,
+        family_regex=args.family,
+        cache_ttl_hours=args.cache_ttl_hours,
+    )
     logging.info("Found %d SKUs (filtered)", len(prices))
 
     logging.info("Checking Vertex AI Model Garden candidates (project=%s region=%s)", args.project, args.region)
@@ -353,14 +540,16 @@ def main() -> None:
         "ts": dt.datetime.utcnow().isoformat() + "Z",
         "project": args.project,
         "region": args.region,
-        "prices": [dataclasses.asdict(p) for p in prices],
-        "vertexModels": [dataclasses.asdict(m) for m in models],
-        "veoModels": [dataclasses.asdict(m) for m in veo],
+        # Column-wise: {"sku_id": [...], "unit_price": [...], ...}
+        "prices": prices.to_columns(),
+        "vertexModels": [_model_info_to_dict(m) for m in models],
+        "veoModels": [_model_info_to_dict(m) for m in veo],
     }
 
     if args.out_json:
-        with open(args.out_json, "w", encoding="utf-8") as f:
-            json.dump(payload, f, ensure_ascii=False, indent=2, default=str)
+        # orjson writes UTF-8 directly; Decimal prices go through default=str.
+        with open(args.out_json, "wb") as f:
+            f.write(orjson.dumps(payload, option=orjson.OPT_INDENT_2, default=str))
         logging.info("Wrote %s", args.out_json)
 
     if args.db_url:
@@ -1,9 +1,10 @@
-import json
+import orjson
 
 p = r"D:\tm-ia\tools\daily_sync\out.json"
-j = json.load(open(p, "r", encoding="utf-8"))
+with open(p, "rb") as f:
+    j = orjson.loads(f.read())
 
-print("SKUs:", len(j.get("prices", [])))
+print("SKUs:", len(j.get("prices", {}).get("sku_id", [])))
 print("veoModels entries:", len(j.get("veoModels", [])))
 
 for m in j.get("veoModels", [])[:20]:
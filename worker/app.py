@@ -1,34 +1,249 @@
 import os
-import shutil
-import uuid
-import subprocess
-import requests
-import json
 from pathlib import Path
+
+def effective_cpus() -> int:
+    """CPUs this container may actually use (affinity and cgroup v2 quota), not the host's count."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+# num_workers > 1 lets CTranslate2 run that many transcriptions in parallel on one copy of
+# the weights (calls must come from different threads); the CPU quota is split between them.
+NUM_WORKERS = max(1, int(os.getenv("WHISPER_WORKERS", "2")))
+CPU_THREADS = max(1, effective_cpus() // NUM_WORKERS)
+# OpenMP/MKL size their thread pools when first loaded (numpy's BLAS included), so these
+# must be set before numpy or faster_whisper is imported
+os.environ.setdefault("OMP_NUM_THREADS", str(CPU_THREADS))
+os.environ.setdefault("MKL_NUM_THREADS", str(CPU_THREADS))
+# CTranslate2's CUDA caching allocator (bin_growth,min_bin,max_bin,max_cached_bytes): bins up to
+# 4^14 bytes so batched encoder activations are reused instead of cudaMalloc/cudaFree per request,
+# and up to 1 GiB kept cached between requests. Ignored on CPU.
+os.environ.setdefault("CT2_CUDA_ALLOCATOR", "cub_caching")
+os.environ.setdefault("CT2_CUDA_CACHING_ALLOCATOR_CONFIG", "4,3,14,1073741824")
+
+import asyncio
+import functools
+import hashlib
+import threading
+import subprocess
+import tempfile
+import httpx
+import numpy as np
+import orjson
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
-from faster_whisper import WhisperModel
+from typing import List, Optional, Tuple
+from types import SimpleNamespace
+
+from faster_whisper import BatchedInferencePipeline, WhisperModel
+
+try:
+    from blake3 import blake3 as content_hash  # optional, several times faster than sha256 on AVX2
+except ImportError:
+    content_hash = hashlib.sha256
 
 app = FastAPI()
 
 # Configuration
 MODEL_SIZE = os.getenv("WHISPER_MODEL", "small")
 DEVICE = "cuda" if os.getenv("USE_GPU", "false").lower() == "true" else "cpu"
-COMPUTE_TYPE = "float16" if DEVICE == "cuda" else "int8"
+# CTranslate2 compute type. int8_float16 = int8 weights with fp16 activations (tensor cores).
+# WHISPER_QUANT is the older name; int4 selects the whisper.cpp backend.
+COMPUTE_TYPE = (
+    os.getenv("WHISPER_COMPUTE_TYPE")
+    or os.getenv("WHISPER_QUANT")
+    or ("int8_float16" if DEVICE == "cuda" else "int8")
+)
+# "ctranslate2" (faster-whisper), "whispercpp" (GGML weights) or "auto" (see load_model)
+WHISPER_BACKEND = os.getenv("WHISPER_BACKEND") or ("whispercpp" if COMPUTE_TYPE == "int4" else "auto")
+# GGML quantization of /tmp/models/ggml-{size}-{quant}.bin for the whisper.cpp backend (q4_k, q4_0, q5_0...)
+GGML_QUANT = os.getenv("WHISPER_GGML_QUANT", "q4_k")
+MODELS_DIR = Path("/tmp/models")
+# Number of 30s chunks decoded together per file; 1 disables batching
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "8"))
+# Extra models (req.model other than WHISPER_MODEL) kept loaded, keyed by (size, device, compute_type)
+MODEL_CACHE_SIZE = int(os.getenv("WHISPER_MODEL_CACHE", "2"))
+# Opt-in: clips shorter than SHORT_CLIP_SECONDS go to this smaller resident model (e.g. "base")
+# unless req.model is set. Keep it multilingual (distil-*.en models are English-only).
+SHORT_MODEL = os.getenv("WHISPER_SHORT_MODEL", "")
+SHORT_CLIP_SECONDS = float(os.getenv("SHORT_CLIP_SECONDS", "10"))
+# Models req.model may name (comma-separated); defaults to the ones baked into the image, so
+# callers cannot trigger runtime downloads of multi-GB models or churn the model LRU
+ALLOWED_MODELS = {
+    m.strip()
+    for m in (os.getenv("WHISPER_ALLOWED_MODELS") or f"{MODEL_SIZE},{SHORT_MODEL}").split(",")
+    if m.strip()
+}
+# Downloads larger than this are rejected with 413 (checked against Content-Length, then while streaming)
+MAX_AUDIO_BYTES = int(os.getenv("MAX_AUDIO_BYTES", str(200 * 1024 * 1024)))
+# Decoded length cap: low-bitrate input under MAX_AUDIO_BYTES can still expand to GBs of float32
+MAX_AUDIO_SECONDS = int(os.getenv("MAX_AUDIO_SECONDS", "3600"))
 
-print(f"Loading Whisper model: {MODEL_SIZE} on {DEVICE}...")
+class WhisperCppModel:
+    """Thin whisper.cpp wrapper exposing faster-whisper's transcribe() contract."""
+
+    def __init__(self, model_path: Path):
+        from pywhispercpp.model import Model  # optional dependency, only needed for whispercpp
+        self._model = Model(str(model_path), n_threads=effective_cpus(), print_progress=False)
+        # whisper_full is not thread-safe on one context, and each call already uses every CPU
+        self._lock = threading.Lock()
+
+    def transcribe(self, audio, language: Optional[str] = None, **kwargs):
+        # whisper.cpp reports timestamps in centiseconds
+        with self._lock:
+            raw = self._model.transcribe(audio, language=language or "auto")
+        segments = [SimpleNamespace(start=s.t0 / 100, end=s.t1 / 100, text=s.text) for s in raw]
+        if isinstance(audio, np.ndarray):
+            duration = len(audio) / 16000  # 16 kHz samples, as faster-whisper reports it
+        else:
+            duration = segments[-1].end if segments else 0.0
+        info = SimpleNamespace(language=language, duration=duration)
+        return iter(segments), info
+
+def load_model(size: str, device: str, compute_type: str):
+    """Build the Whisper model for size/device.
+
+    whisper.cpp is used when WHISPER_BACKEND=whispercpp, or in "auto" mode for
+    large models on CPU when a GGML file is present (int8 CTranslate2 is far from
+    real-time there). Everything else runs on CTranslate2 with compute_type.
+    """
+    ggml_path = MODELS_DIR / f"ggml-{size}-{GGML_QUANT}.bin"
+    use_cpp = WHISPER_BACKEND == "whispercpp" or (
+        WHISPER_BACKEND == "auto" and device == "cpu" and size.startswith("large") and ggml_path.exists()
+    )
+    if use_cpp:
+        return WhisperCppModel(ggml_path)
+    return WhisperModel(
+        size,
+        device=device,
+        compute_type=compute_type,
+        cpu_threads=CPU_THREADS,
+        num_workers=NUM_WORKERS,
+        download_root=str(MODELS_DIR),
+    )
+
+def _build_model(size: str, device: str, compute_type: str):
+    model = load_model(size, device, compute_type)
+    batched = BatchedInferencePipeline(model=model) if isinstance(model, WhisperModel) and BATCH_SIZE > 1 else None
+    return model, batched
+
+# WHISPER_MODEL stays resident; other sizes requested through req.model share a small LRU
+_cached_model = functools.lru_cache(maxsize=MODEL_CACHE_SIZE)(_build_model)
+_pinned_models = {}
+_model_locks = {}
+_model_locks_guard = threading.Lock()
+
+def get_model(size: str, device: str = DEVICE, compute_type: str = COMPUTE_TYPE):
+    """Return (model, batched pipeline or None), loading each configuration once even under concurrent first hits."""
+    key = (size, device, compute_type)
+    if key in _pinned_models:
+        return _pinned_models[key]
+    with _model_locks_guard:
+        lock = _model_locks.setdefault(key, threading.Lock())
+    with lock:
+        return _cached_model(*key)
+
+print(f"Loading Whisper model: {MODEL_SIZE} on {DEVICE} ({WHISPER_BACKEND}, {COMPUTE_TYPE})...")
 try:
-    model = WhisperModel(MODEL_SIZE, device=DEVICE, compute_type=COMPUTE_TYPE, download_root="/tmp/models")
-    print("Model loaded successfully.")
+    _pinned_models[(MODEL_SIZE, DEVICE, COMPUTE_TYPE)] = _build_model(MODEL_SIZE, DEVICE, COMPUTE_TYPE)
+    model, _ = _pinned_models[(MODEL_SIZE, DEVICE, COMPUTE_TYPE)]
+    print(f"Model loaded successfully ({type(model).__name__}).")
 except Exception as e:
     print(f"Failed to load model: {e}")
     model = None
 
+if SHORT_MODEL and SHORT_MODEL != MODEL_SIZE:
+    print(f"Loading short-clip Whisper model: {SHORT_MODEL}...")
+    try:
+        _pinned_models[(SHORT_MODEL, DEVICE, COMPUTE_TYPE)] = _build_model(SHORT_MODEL, DEVICE, COMPUTE_TYPE)
+    except Exception as e:
+        print(f"Failed to load short-clip model: {e}")
+
+# Inference runs here, never on the event loop: one thread per CTranslate2 worker so
+# NUM_WORKERS transcriptions overlap while /health and downloads stay responsive
+INFERENCE_POOL = ThreadPoolExecutor(max_workers=NUM_WORKERS, thread_name_prefix="whisper")
+
+_warmup_lock = threading.Lock()
+
+def warmup_model() -> bool:
+    """Transcribe 1s of silence with each resident model so CUDA/cuBLAS handles and CTranslate2
+    buffers exist before real traffic.
+
+    Returns False if there is no model or another warmup is already running.
+    """
+    if model is None or not _warmup_lock.acquire(blocking=False):
+        return False
+    try:
+        for whisper, _ in list(_pinned_models.values()):
+            segments, _ = whisper.transcribe(np.zeros(16000, dtype=np.float32), language="pt", vad_filter=False)
+            for _ in segments:
+                pass
+        return True
+    finally:
+        _warmup_lock.release()
+
+try:
+    if warmup_model():
+        print("Model warmed up.")
+except Exception as e:
+    print(f"Warmup failed: {e}")
+
+# Shared async HTTP client: keep-alive/HTTP2 connections reused across requests, and
+# downloads for concurrent /transcribe calls proceed in parallel on the event loop
+HTTP = httpx.AsyncClient(
+    transport=httpx.AsyncHTTPTransport(http2=True, retries=3, limits=httpx.Limits(max_connections=64)),
+    timeout=httpx.Timeout(30.0, connect=10.0),
+    follow_redirects=True,
+)
+
+# Transcription results by audio content hash (optional, only when REDIS_URL is set)
+REDIS_URL = os.getenv("REDIS_URL")
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", str(24 * 3600)))
+if REDIS_URL:
+    import redis.asyncio as aioredis  # optional dependency
+    RESULT_CACHE = aioredis.from_url(REDIS_URL)
+else:
+    RESULT_CACHE = None
+
+# Detected language by audio content hash: retries of the same audio skip Whisper's detection pass
+LANGUAGE_CACHE_SIZE = 1024
+_language_cache: "OrderedDict[str, str]" = OrderedDict()
+_language_cache_lock = threading.Lock()
+
+def cached_language(audio_hash: str) -> Optional[str]:
+    with _language_cache_lock:
+        language = _language_cache.get(audio_hash)
+        if language:
+            _language_cache.move_to_end(audio_hash)
+        return language
+
+def remember_language(audio_hash: str, language: str):
+    with _language_cache_lock:
+        _language_cache[audio_hash] = language
+        _language_cache.move_to_end(audio_hash)
+        if len(_language_cache) > LANGUAGE_CACHE_SIZE:
+            _language_cache.popitem(last=False)
+
 class TranscribeRequest(BaseModel):
     audioUrl: str
-    language: str = "pt"
-    model: str = "small"
+    language: Optional[str] = "pt"  # null/"" lets Whisper auto-detect
+    model: Optional[str] = None  # defaults to WHISPER_MODEL; must be in WHISPER_ALLOWED_MODELS
+    # Emit segments while decoding: SSE, or NDJSON when the client sends Accept: application/x-ndjson
+    stream: bool = False
+    # Silero VAD inside faster-whisper: skip silent stretches instead of decoding them
+    vadFilter: bool = True
+    minSilenceMs: int = 500
 
 class RenderAsset(BaseModel):
     id: str
@@ -43,58 +258,265 @@ class RenderRequest(BaseModel):
     format: str = "vertical" # vertical, horizontal, square
     callbackUrl: Optional[str] = None
 
-def download_file(url: str, dest_path: Path):
-    with requests.get(url, stream=True) as r:
+async def _ffmpeg_pcm(src: str, chunks=None) -> bytearray:
+    """Decode src with ffmpeg into 16 kHz mono float32 PCM.
+
+    src is a file path, or "pipe:0" with chunks (an async iterator of bytes) written to ffmpeg's stdin.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-loglevel", "error", "-i", src, "-f", "f32le", "-ac", "1", "-ar", "16000", "pipe:1",
+        stdin=subprocess.PIPE if chunks is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+    def abort():
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+
+    async def feed():
+        if chunks is None:
+            return
+        try:
+            async for chunk in chunks:
+                proc.stdin.write(chunk)
+                await proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            raise
+        except BaseException:
+            # Download failed or was rejected: don't let ffmpeg finish decoding what it already has
+            abort()
+            raise
+        finally:
+            proc.stdin.close()
+
+    async def read_pcm():
+        max_bytes = MAX_AUDIO_SECONDS * 16000 * 4  # 16 kHz float32
+        pcm = bytearray()
+        while chunk := await proc.stdout.read(1 << 20):
+            pcm += chunk
+            if len(pcm) > max_bytes:
+                abort()
+                raise HTTPException(status_code=413, detail=f"Audio longer than {MAX_AUDIO_SECONDS} seconds")
+        return pcm
+
+    async def drain_stderr():
+        tail = deque(maxlen=20)
+        async for line in proc.stderr:
+            tail.append(line)
+        return tail
+
+    try:
+        feed_result, pcm, stderr_tail = await asyncio.gather(
+            feed(), read_pcm(), drain_stderr(), return_exceptions=True
+        )
+        await proc.wait()
+    finally:
+        abort()
+
+    # A failed download also makes ffmpeg fail; report the download error.
+    # A broken pipe only means ffmpeg exited first; its stderr says why.
+    if isinstance(feed_result, Exception) and not isinstance(feed_result, (BrokenPipeError, ConnectionResetError)):
+        raise feed_result
+    for result in (pcm, stderr_tail):
+        if isinstance(result, Exception):
+            raise result
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg decode failed: {b''.join(stderr_tail).decode(errors='replace')[-500:]}")
+    return pcm
+
+async def decode_audio_url(url: str) -> Tuple[np.ndarray, str]:
+    """Stream url through ffmpeg into 16 kHz mono samples.
+
+    Audio is piped straight into ffmpeg without touching disk, except MP4/M4A, which is spooled to
+    a temp file first. Returns the float32 waveform faster-whisper expects and the content hash of
+    the downloaded bytes.
+    """
+    digest = content_hash()
+    async with HTTP.stream("GET", url) as r:
         r.raise_for_status()
-        with open(dest_path, 'wb') as f:
-            for chunk in r.iter_content(chunk_size=8192):
-                f.write(chunk)
-    return dest_path
+        if int(r.headers.get("content-length") or 0) > MAX_AUDIO_BYTES:
+            raise HTTPException(status_code=413, detail=f"Audio larger than {MAX_AUDIO_BYTES} bytes")
+
+        async def body():
+            received = 0
+            # 1 MiB chunks: few Python-level iterations (hash update + pipe write) per file
+            async for chunk in r.aiter_bytes(1 << 20):
+                # Content-Length may be missing or wrong; count what actually arrives
+                received += len(chunk)
+                if received > MAX_AUDIO_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Audio larger than {MAX_AUDIO_BYTES} bytes")
+                digest.update(chunk)
+                yield chunk
+
+        chunks = body()
+        first = await anext(chunks, b"")
+        if first[4:8] == b"ftyp":
+            # MP4/M4A usually keeps its index (moov atom) at the end, which ffmpeg cannot seek back from on a pipe
+            with tempfile.NamedTemporaryFile(suffix=".m4a") as tf:
+                tf.write(first)
+                async for chunk in chunks:
+                    tf.write(chunk)
+                tf.flush()
+                pcm = await _ffmpeg_pcm(tf.name)
+        else:
+            async def replay():
+                yield first
+                async for chunk in chunks:
+                    yield chunk
+
+            pcm = await _ffmpeg_pcm("pipe:0", replay())
+    # Already the 16 kHz mono float32 faster-whisper uses internally: no conversion, no second decode
+    return np.frombuffer(pcm, np.float32), digest.hexdigest()
+
+def sse_segments(segments, info):
+    """Yield each segment as an SSE `data:` event, then a final `done` event with the summary."""
+    full_text = []
+    try:
+        for segment in segments:
+            text = segment.text.strip()
+            full_text.append(text)
+            yield f"data: {orjson.dumps({'start': segment.start, 'end': segment.end, 'text': text}).decode()}\n\n"
+    except Exception as e:
+        print(f"Error: {e}")
+        yield f"event: error\ndata: {orjson.dumps({'detail': str(e)}).decode()}\n\n"
+        return
+    done = {"language": info.language, "duration": info.duration, "text": " ".join(full_text)}
+    yield f"event: done\ndata: {orjson.dumps(done).decode()}\n\n"
+
+def ndjson_segments(segments, info):
+    """Yield one JSON line per segment, then a summary line; clients concatenate text as it arrives."""
+    try:
+        for segment in segments:
+            yield orjson.dumps({"start": segment.start, "end": segment.end, "text": segment.text.strip()}) + b"\n"
+    except Exception as e:
+        print(f"Error: {e}")
+        yield orjson.dumps({"type": "error", "detail": str(e)}) + b"\n"
+        return
+    yield orjson.dumps({"type": "summary", "language": info.language, "duration": info.duration}) + b"\n"
+
+def run_inference(whisper, batched, audio: np.ndarray, language: Optional[str], vad_filter: bool, min_silence_ms: int):
+    vad_parameters = dict(min_silence_duration_ms=min_silence_ms)
+    # The batched pipeline builds its chunks from VAD; without VAD it rejects audio over 30s
+    if batched and vad_filter:
+        return batched.transcribe(
+            audio, language=language, batch_size=BATCH_SIZE,
+            vad_filter=vad_filter, vad_parameters=vad_parameters,
+            # Keep Whisper's sentence-level segments; the default returns one segment per
+            # VAD chunk (up to 30s), too coarse for the storyboard timing built from them
+            without_timestamps=False,
+        )
+    return whisper.transcribe(
+        audio, language=language,
+        vad_filter=vad_filter, vad_parameters=vad_parameters,
+    )
+
+def collect_segments(segments):
+    """Drain the lazy segment generator (this is where decoding happens)."""
+    results = [
+        {"start": segment.start, "end": segment.end, "text": segment.text.strip()}
+        for segment in segments
+    ]
+    return results, " ".join(r["text"] for r in results)
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "device": DEVICE, "model_loaded": model is not None}
+    return {
+        "status": "ok",
+        "device": DEVICE,
+        "backend": type(model).__name__ if model else None,
+        "compute_type": COMPUTE_TYPE,
+        "model_loaded": model is not None,
+    }
+
+@app.get("/warmup")
+def warmup():
+    # Readiness probe target: keeps the model hot between idle periods
+    if model is None:
+        raise HTTPException(status_code=500, detail="Whisper model not initialized")
+    return {"status": "ok", "warmed": warmup_model()}
 
 @app.post("/transcribe")
-async def transcribe(req: TranscribeRequest):
-    if not model:
+async def transcribe(req: TranscribeRequest, request: Request):
+    if req.model and req.model not in ALLOWED_MODELS:
+        raise HTTPException(status_code=400, detail=f"Whisper model not allowed: {req.model}")
+    # WHISPER_MODEL failed to load at startup: fail before downloading instead of retrying the load per request
+    if model is None:
         raise HTTPException(status_code=500, detail="Whisper model not initialized")
 
-    tmp_id = str(uuid.uuid4())
-    tmp_dir = Path("/tmp/work") / tmp_id
-    tmp_dir.mkdir(parents=True, exist_ok=True)
-    audio_path = tmp_dir / "audio.mp3"
+    try:
+        print(f"Downloading and decoding audio from {req.audioUrl}...")
+        audio, audio_hash = await decode_audio_url(req.audioUrl)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    size = req.model or MODEL_SIZE
+    # Only when the short model loaded at startup; otherwise every short clip would retry the load
+    short_key = (SHORT_MODEL, DEVICE, COMPUTE_TYPE)
+    if not req.model and short_key in _pinned_models and len(audio) / 16000 < SHORT_CLIP_SECONDS:
+        # Fixed per-call cost dominates short clips: the smaller model answers them several times faster
+        size = SHORT_MODEL
+
+    # Checked before get_model: a hit must not load (or download) a non-resident model
+    cache_key = f"whisper:{size}:{req.language or 'auto'}:{int(req.vadFilter)}:{req.minSilenceMs}:{audio_hash}"
+    if RESULT_CACHE and not req.stream:
+        try:
+            cached = await RESULT_CACHE.get(cache_key)
+        except Exception as e:
+            print(f"Result cache read failed: {e}")
+            cached = None
+        if cached:
+            return Response(cached, media_type="application/json", headers={"X-Cache": "HIT"})
 
     try:
-        print(f"Downloading audio from {req.audioUrl}...")
-        download_file(req.audioUrl, audio_path)
-        
+        # Loading a model that is not cached yet takes seconds; keep it off the event loop
+        whisper, batched = await asyncio.to_thread(get_model, size)
+    except Exception as e:
+        print(f"Failed to load model {size}: {e}")
+        raise HTTPException(status_code=500, detail=f"Whisper model not initialized: {size}")
+
+    try:
+        language = req.language or cached_language(audio_hash)
+
         print("Transcribing...")
-        segments, info = model.transcribe(str(audio_path), language=req.language)
-        
-        # Collect segments
-        results = []
-        full_text = []
-        for segment in segments:
-            results.append({
-                "start": segment.start,
-                "end": segment.end,
-                "text": segment.text.strip()
-            })
-            full_text.append(segment.text.strip())
-            
-        return {
+        loop = asyncio.get_running_loop()
+        segments, info = await loop.run_in_executor(
+            INFERENCE_POOL,
+            functools.partial(run_inference, whisper, batched, audio, language, req.vadFilter, req.minSilenceMs),
+        )
+        if not language and info.language:
+            remember_language(audio_hash, info.language)
+
+        if req.stream:
+            if "application/x-ndjson" in request.headers.get("accept", ""):
+                return StreamingResponse(ndjson_segments(segments, info), media_type="application/x-ndjson")
+            return StreamingResponse(sse_segments(segments, info), media_type="text/event-stream")
+
+        results, text = await loop.run_in_executor(INFERENCE_POOL, collect_segments, segments)
+
+        body = orjson.dumps({
             "language": info.language,
             "duration": info.duration,
-            "text": " ".join(full_text),
+            "text": text,
             "segments": results
-        }
+        })
+        if not RESULT_CACHE:
+            return Response(body, media_type="application/json")
+        try:
+            await RESULT_CACHE.setex(cache_key, RESULT_CACHE_TTL, body)
+        except Exception as e:
+            print(f"Result cache write failed: {e}")
+        return Response(body, media_type="application/json", headers={"X-Cache": "MISS"})
 
     except Exception as e:
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        shutil.rmtree(tmp_dir, ignore_errors=True)
 
 # TODO: Implement /render endpoint calling FFmpeg
 @app.post("/render")